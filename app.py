@@ -1,10 +1,11 @@
 import streamlit as st
 import pandas as pd
+import polars as pl
 import plotly.express as px
 import plotly.graph_objects as go
 import datetime
-from prophet import Prophet
-from prophet.plot import plot_plotly
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -30,40 +31,216 @@ st.title("🤖 AI Market Analysis & Forecasting Dashboard")
 st.markdown("An advanced tool for analyzing market trends and predicting future outcomes.")
 
 # --- Data Loading and Caching ---
-@st.cache_data
-def load_data(filepath):
-    """Loads and preprocesses data from a CSV file."""
+@st.cache_data(persist="disk", show_spinner=False)
+def load_data(filepath, date_cols=(), mtime=None):
+    """Loads data from a Parquet or CSV file. `mtime` only keys the cache so regenerated files reload."""
     try:
-        df = pd.read_csv(filepath)
-        for col in ['Launch_Date', 'TransactionDate']:
-            if col in df.columns:
-                df[col] = pd.to_datetime(df[col])
-        return df
+        if filepath.endswith('.parquet'):
+            return pd.read_parquet(filepath)
+        # Arrow's multithreaded reader; date columns are read straight into timestamps
+        date_types = {col: 'timestamp[ns][pyarrow]' for col in date_cols}
+        return pd.read_csv(filepath, engine='pyarrow', dtype_backend='pyarrow', dtype=date_types)
     except FileNotFoundError:
         return None
 
+def load_dataset(name, date_cols=()):
+    """Loads `name`.parquet when it has been generated, falling back to `name`.csv."""
+    for filepath in (f"{name}.parquet", f"{name}.csv"):
+        if os.path.exists(filepath):
+            return load_data(filepath, date_cols, mtime=os.path.getmtime(filepath))
+    return None
+
 def initialize_session_state():
-    """Initializes session state for products and sales data."""
+    """Initializes session state for products and sales data and their headline KPIs."""
     if 'products_df' not in st.session_state:
-        loaded_products = load_data('products.csv')
+        loaded_products = load_dataset('products', date_cols=('Launch_Date',))
         st.session_state.products_df = loaded_products if loaded_products is not None else pd.DataFrame()
+        st.session_state.product_kpis = product_kpis(st.session_state.products_df) if loaded_products is not None else {}
 
     if 'sales_df' not in st.session_state:
-        loaded_sales = load_data('sales_transactions.csv')
+        loaded_sales = load_dataset('sales_transactions', date_cols=('TransactionDate',))
         st.session_state.sales_df = loaded_sales if loaded_sales is not None else pd.DataFrame()
+        st.session_state.sales_kpis = customer_kpis(st.session_state.sales_df) if loaded_sales is not None else {}
+
+# --- Cached Aggregations ---
+@st.cache_data
+def annual_launch_counts(df):
+    """Number of product launches per year."""
+    launch_year = df['Launch_Date'].dt.year.astype(str).rename('Year')
+    return df.groupby(launch_year).size().reset_index(name='Product_ID')
+
+@st.cache_data
+def annual_avg_price(df):
+    """Average launch price per year."""
+    launch_year = df['Launch_Date'].dt.year.astype(str).rename('Year')
+    return df.groupby(launch_year).agg(Price=('Price', 'mean')).reset_index()
+
+@st.cache_data
+def daily_transaction_counts(df):
+    """Number of transactions per day, with zero-activity days filled in as 0."""
+    # The groupby runs in Polars; Prophet and the charts still get a pandas frame
+    daily = (
+        pl.from_pandas(df[['TransactionDate', 'TransactionID']])
+        .group_by('TransactionDate')
+        .agg(pl.col('TransactionID').count())
+        .sort('TransactionDate')
+        .to_pandas()
+    )
+    return daily.set_index('TransactionDate')['TransactionID'].asfreq('D', fill_value=0).reset_index()
+
+@st.cache_data
+def product_kpis(df):
+    """Headline product metrics: product count, average price and latest launch."""
+    return {
+        'n': df['Product_ID'].nunique(),
+        'avg_price': df['Price'].mean(),
+        'last_launch': df['Launch_Date'].max(),
+    }
+
+@st.cache_data
+def customer_kpis(df):
+    """Headline customer metrics: transactions, unique customers and revenue."""
+    return {
+        'transactions': df['TransactionID'].nunique(),
+        'customers': df['CustomerID'].nunique(),
+        'revenue': df['TotalPrice'].sum(),
+    }
 
 # --- AI Model Functions ---
-def run_prophet_forecast(df, date_col, value_col, periods=365):
-    """Generic Prophet forecasting function."""
+def hash_dataframe(df):
+    """Content hash of a DataFrame, so identical data maps to the same cache entry."""
+    return pd.util.hash_pandas_object(df, index=True).values.tobytes()
+
+# No cache spinner: `start_forecast_fits` calls this from worker threads without a script context
+@st.cache_resource(max_entries=8, show_spinner=False, hash_funcs={pd.DataFrame: hash_dataframe})
+def _fit_prophet(prophet_df, show_uncertainty=True):
+    """Fits a Prophet model once per distinct training frame."""
+    # Imported here so the page renders without waiting on Prophet's import chain
+    from prophet import Prophet
+
+    # Launch and transaction series carry no intra-week structure; yearly
+    # seasonality can't be estimated from less than two years of history.
+    has_two_years = prophet_df['ds'].max() - prophet_df['ds'].min() >= pd.Timedelta(days=730)
+    model = Prophet(
+        mcmc_samples=0,
+        uncertainty_samples=100 if show_uncertainty else 0,
+        yearly_seasonality='auto' if has_two_years else False,
+        weekly_seasonality=False,
+        daily_seasonality=False,
+    )
+    # MAP fit only. The optimizer is left at Prophet's default (LBFGS, retried with
+    # Newton on failure); pinning it or capping iterations shifts the product forecast.
+    model.fit(prophet_df)
+    return model
+
+@st.cache_data(max_entries=32)
+def _predict_prophet(_model, data_key, show_uncertainty, periods):
+    """Predicts with a fitted model; only this step reruns when the horizon changes.
+
+    The cache is keyed by the training data (`data_key`, `show_uncertainty`) rather than
+    the model object, whose `id` can be reused once `_fit_prophet` evicts it.
+    """
+    future = _model.make_future_dataframe(periods=periods, include_history=False)
+    return _model.predict(future)
+
+def prophet_frame(df, date_col, value_col):
+    """Builds Prophet's `ds`/`y` training frame, or returns None if there is too little data."""
     if df.empty or date_col not in df.columns or value_col not in df.columns or len(df) < 2:
+        return None
+    # Prophet needs NumPy-backed columns, not the Arrow dtypes `load_data` produces
+    prophet_df = df[[date_col, value_col]].rename(columns={date_col: 'ds', value_col: 'y'}).astype({'ds': 'datetime64[ns]', 'y': 'float64'})
+    if len(prophet_df) > 1000:
+        # Fit time grows with history length; long histories are fit on weekly means
+        prophet_df = prophet_df.set_index('ds').resample('W').mean().dropna().reset_index()
+    return prophet_df
+
+def run_prophet_forecast(df, date_col, value_col, periods=365, show_uncertainty=True):
+    """Generic Prophet forecasting function. Skips interval sampling when `show_uncertainty` is False."""
+    prophet_df = prophet_frame(df, date_col, value_col)
+    if prophet_df is None:
         return None, None
-    prophet_df = df[[date_col, value_col]].rename(columns={date_col: 'ds', value_col: 'y'})
-    model = Prophet()
-    model.fit(prophet_df)
-    future = model.make_future_dataframe(periods=periods)
-    forecast = model.predict(future)
+    model = _fit_prophet(prophet_df, show_uncertainty)
+    forecast = _predict_prophet(model, hash_dataframe(prophet_df), show_uncertainty, periods)
     return model, forecast
 
+def start_forecast_fits():
+    """Trains both default forecasts in parallel on first visit instead of one per tab.
+
+    Stan runs in a separate process, so threads are enough and the frames never need
+    pickling. Both fits are awaited, so the forecast fragments find them cached.
+    """
+    if st.session_state.get('forecast_fits_started'):
+        return
+    frames = [prophet_frame(st.session_state.products_df, 'Launch_Date', 'Price')]
+    if not st.session_state.sales_df.empty:
+        frames.append(prophet_frame(daily_transaction_counts(st.session_state.sales_df), 'TransactionDate', 'TransactionID'))
+    with st.spinner("Training forecast models..."), ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(_fit_prophet, df, True) for df in frames if df is not None]
+    for future in futures:
+        future.result()
+    st.session_state.forecast_fits_started = True
+
+# --- Plotting Helpers ---
+@st.cache_data(max_entries=32, hash_funcs={pd.DataFrame: hash_dataframe})
+def product_forecast_figure(history, forecast):
+    """Builds the product price forecast chart once per training history and forecast."""
+    # The forecast only covers future dates, so the observed prices are plotted from `history`
+    ds = forecast['ds'].to_numpy()
+    traces = [
+        go.Scattergl(x=history['ds'].to_numpy(), y=history['y'].to_numpy(), mode='markers', name='Actual', marker=dict(color='black', size=4)),
+        go.Scattergl(x=ds, y=forecast['yhat'].to_numpy(), mode='lines', name='Predicted', line=dict(color='#0072B2', width=2)),
+    ]
+    if 'yhat_lower' in forecast.columns:
+        traces += [
+            go.Scattergl(x=ds, y=forecast['yhat_upper'].to_numpy(), fill=None, mode='lines', line=dict(width=0), hoverinfo='skip', showlegend=False),
+            go.Scattergl(x=ds, y=forecast['yhat_lower'].to_numpy(), fill='tonexty', mode='lines', name='Confidence Interval', line=dict(width=0), fillcolor='rgba(0, 114, 178, 0.2)'),
+        ]
+    layout = go.Layout(title="Forecast of Average Price for New Products", xaxis_title="Date", yaxis_title="Predicted Avg. Price")
+    return go.Figure(data=traces, layout=layout)
+
+@st.cache_data(max_entries=32, hash_funcs={pd.DataFrame: hash_dataframe})
+def customer_forecast_figure(forecast):
+    """Builds the customer transaction forecast chart once per forecast."""
+    # Plain arrays and a single Figure call skip per-Series conversion and per-trace validation
+    ds = forecast['ds'].to_numpy()
+    traces = [go.Scattergl(x=ds, y=forecast['yhat'].to_numpy(), mode='lines', name='Predicted Transactions', line=dict(color='#f63366'))]
+    if 'yhat_lower' in forecast.columns:
+        traces += [
+            go.Scattergl(x=ds, y=forecast['yhat_upper'].to_numpy(), fill=None, mode='lines', line=dict(color='rgba(246, 51, 102, 0.2)')),
+            go.Scattergl(x=ds, y=forecast['yhat_lower'].to_numpy(), fill='tonexty', mode='lines', name='Confidence Interval', line=dict(color='rgba(246, 51, 102, 0.2)')),
+        ]
+    layout = go.Layout(title="Forecast of Daily Customer Transactions", xaxis_title="Date", yaxis_title="Predicted Transactions")
+    return go.Figure(data=traces, layout=layout)
+
+# --- Forecast Fragments ---
+@st.fragment
+def product_forecast_fragment(df_products):
+    """Price forecast controls and chart; reruns on its own when its widgets change."""
+    forecast_days = st.slider("Select Forecast Period (Days)", 90, 730, 365, key="product_forecast_slider")
+    show_uncertainty = st.checkbox("Show confidence interval", value=True, key="product_show_uncertainty")
+    st.info(f"The model is predicting the average price of new products for the next **{forecast_days} days**.")
+
+    model, forecast = run_prophet_forecast(df_products, 'Launch_Date', 'Price', periods=forecast_days, show_uncertainty=show_uncertainty)
+    if forecast is not None:
+        st.plotly_chart(product_forecast_figure(model.history[['ds', 'y']], forecast), use_container_width=True)
+    else:
+        st.warning("Not enough data for price forecasting. At least two data points are required.")
+
+@st.fragment
+def customer_forecast_fragment(df_sales):
+    """Transaction forecast controls and chart; reruns on its own when its widgets change."""
+    forecast_days = st.slider("Select Forecast Period (Days)", 90, 730, 365, key="customer_forecast_slider")
+    show_uncertainty = st.checkbox("Show confidence interval", value=True, key="customer_show_uncertainty")
+    st.info(f"The model is predicting the number of daily customer transactions for the next **{forecast_days} days**.")
+
+    daily_transactions = daily_transaction_counts(df_sales)
+    model, forecast = run_prophet_forecast(daily_transactions, 'TransactionDate', 'TransactionID', periods=forecast_days, show_uncertainty=show_uncertainty)
+
+    if forecast is not None:
+        st.plotly_chart(customer_forecast_figure(forecast), use_container_width=True)
+    else:
+        st.warning("Not enough data for transaction forecasting. At least two transactions on different days are required.")
+
 # --- Initialize Data ---
 initialize_session_state()
 
@@ -95,39 +272,31 @@ with tab1:
     if not df_products.empty:
         with prod_tab1:
             st.subheader("Key Product Metrics at a Glance")
+            kpis = st.session_state.product_kpis
             col1, col2, col3 = st.columns(3)
-            col1.metric("Total Products", f"{df_products['Product_ID'].nunique()}")
-            col2.metric("Average Price", f"${df_products['Price'].mean():,.2f}")
-            col3.metric("Most Recent Launch", f"{df_products['Launch_Date'].max().strftime('%b %d, %Y')}")
+            col1.metric("Total Products", f"{kpis['n']}")
+            col2.metric("Average Price", f"${kpis['avg_price']:,.2f}")
+            col3.metric("Most Recent Launch", f"{kpis['last_launch'].strftime('%b %d, %Y')}")
 
         with prod_tab2:
             st.subheader("Annual Product Launch Trends")
-            launches_by_year = df_products.set_index('Launch_Date').resample('Y')['Product_ID'].count().reset_index()
-            launches_by_year['Launch_Date'] = launches_by_year['Launch_Date'].dt.year.astype(str)
-            fig_launches = px.bar(launches_by_year, x='Launch_Date', y='Product_ID', labels={'Launch_Date': 'Year', 'Product_ID': 'Number of Launches'})
+            launches_by_year = annual_launch_counts(df_products)
+            fig_launches = px.bar(launches_by_year, x='Year', y='Product_ID', labels={'Product_ID': 'Number of Launches'})
             st.plotly_chart(fig_launches, use_container_width=True)
 
         with prod_tab3:
             st.subheader("Historical Pricing Trends")
-            price_by_year = df_products.set_index('Launch_Date')['Price'].resample('Y').mean().reset_index()
-            price_by_year['Launch_Date'] = price_by_year['Launch_Date'].dt.year.astype(str)
-            fig_price = px.line(price_by_year, x='Launch_Date', y='Price', labels={'Launch_Date': 'Year', 'Price': 'Average Price (USD)'}, markers=True)
+            price_by_year = annual_avg_price(df_products)
+            fig_price = px.line(price_by_year, x='Year', y='Price', labels={'Price': 'Average Price (USD)'}, markers=True)
             st.plotly_chart(fig_price, use_container_width=True)
 
         with prod_tab4:
             st.subheader("Predictive Forecasting for Product Pricing")
-            forecast_days = st.slider("Select Forecast Period (Days)", 90, 730, 365, key="product_forecast_slider")
-            st.info(f"The model is predicting the average price of new products for the next **{forecast_days} days**.")
-            
-            model, forecast = run_prophet_forecast(df_products, 'Launch_Date', 'Price', periods=forecast_days)
-            if forecast is not None:
-                fig_forecast = plot_plotly(model, forecast)
-                fig_forecast.update_layout(title="Forecast of Average Price for New Products", xaxis_title="Date", yaxis_title="Predicted Avg. Price")
-                st.plotly_chart(fig_forecast, use_container_width=True)
-            else:
-                st.warning("Not enough data for price forecasting. At least two data points are required.")
+            # Started here so the overview and analysis tabs paint before any training
+            start_forecast_fits()
+            product_forecast_fragment(df_products)
     else:
-        st.warning("`products.csv` is empty or not found. Please add data to begin analysis.")
+        st.warning("The `products` dataset (.parquet or .csv) is empty or not found. Please add data to begin analysis.")
 
 with tab2:
     st.header("Customer Activity Dashboard")
@@ -136,28 +305,15 @@ with tab2:
     if not df_sales.empty:
         with st.container():
             st.subheader("Key Customer Metrics")
+            kpis = st.session_state.sales_kpis
             col1, col2, col3 = st.columns(3)
-            col1.metric("Total Transactions", f"{df_sales['TransactionID'].nunique():,}")
-            col2.metric("Unique Customers", f"{df_sales['CustomerID'].nunique():,}")
-            col3.metric("Total Revenue", f"${df_sales['TotalPrice'].sum():,.2f}")
+            col1.metric("Total Transactions", f"{kpis['transactions']:,}")
+            col2.metric("Unique Customers", f"{kpis['customers']:,}")
+            col3.metric("Total Revenue", f"${kpis['revenue']:,.2f}")
             st.markdown("---")
 
         with st.container(border=True):
             st.subheader("Predictive Forecasting for Customer Transactions")
-            forecast_days_customer = st.slider("Select Forecast Period (Days)", 90, 730, 365, key="customer_forecast_slider")
-            st.info(f"The model is predicting the number of daily customer transactions for the next **{forecast_days_customer} days**.")
-            
-            daily_transactions = df_sales.groupby('TransactionDate')['TransactionID'].count().reset_index()
-            model, forecast = run_prophet_forecast(daily_transactions, 'TransactionDate', 'TransactionID', periods=forecast_days_customer)
-
-            if forecast is not None:
-                fig_forecast = go.Figure()
-                fig_forecast.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat'], mode='lines', name='Predicted Transactions', line=dict(color='#f63366')))
-                fig_forecast.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat_upper'], fill=None, mode='lines', line=dict(color='rgba(246, 51, 102, 0.2)')))
-                fig_forecast.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat_lower'], fill='tonexty', mode='lines', name='Confidence Interval', line=dict(color='rgba(246, 51, 102, 0.2)')))
-                fig_forecast.update_layout(title="Forecast of Daily Customer Transactions", xaxis_title="Date", yaxis_title="Predicted Transactions")
-                st.plotly_chart(fig_forecast, use_container_width=True)
-            else:
-                st.warning("Not enough data for transaction forecasting. At least two transactions on different days are required.")
+            customer_forecast_fragment(df_sales)
     else:
-        st.warning("`sales_transactions.csv` is empty or not found. Please add data to begin analysis.")
\ No newline at end of file
+        st.warning("The `sales_transactions` dataset (.parquet or .csv) is empty or not found. Please add data to begin analysis.")
\ No newline at end of file
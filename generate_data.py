@@ -1,7 +1,6 @@
 import pandas as pd
 import numpy as np
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
 
 print("Starting data generation...")
 
@@ -20,34 +19,36 @@ END_DATE = datetime.now()
 
 # --- Generate Data ---
 customer_ids = [f"C-{i}" for i in range(1, NUM_CUSTOMERS + 1)]
-product_ids = products_df['Product_ID'].tolist()
-
-transactions = []
-for _ in range(NUM_TRANSACTIONS):
-    # Pick a random customer and product
-    customer_id = random.choice(customer_ids)
-    product_id = random.choice(product_ids)
-
-    # Get product price from the original dataframe
-    price = products_df.loc[products_df['Product_ID'] == product_id, 'Price'].iloc[0]
-
-    # Generate a random date and quantity
-    random_days = random.randint(0, (END_DATE - START_DATE).days)
-    transaction_date = START_DATE + timedelta(days=random_days)
-    quantity = random.randint(1, 4)
-
-    transactions.append({
-        'TransactionID': f"T-{1001 + _}",
-        'CustomerID': customer_id,
-        'ProductID': product_id,
-        'TransactionDate': transaction_date,
-        'Quantity': quantity,
-        'PricePerItem': price,
-        'TotalPrice': price * quantity
-    })
+# Encode products as categorical codes so prices can be indexed directly by code
+product_cats = pd.Categorical(products_df['Product_ID'])
+price_by_code = products_df['Price'].to_numpy()[np.argsort(product_cats.codes)]
 
-# Create DataFrame and save
-sales_df = pd.DataFrame(transactions)
-sales_df.to_csv('sales_transactions.csv', index=False)
+# Sample every transaction at once instead of row by row
+customers = np.random.choice(customer_ids, NUM_TRANSACTIONS)
+product_codes = np.random.randint(0, len(product_cats.categories), NUM_TRANSACTIONS)
+random_days = np.random.randint(0, (END_DATE - START_DATE).days + 1, NUM_TRANSACTIONS)
+quantities = np.random.randint(1, 5, NUM_TRANSACTIONS)
+
+# Resolve IDs and prices by position instead of a lookup join
+products = product_cats.categories.to_numpy()[product_codes]
+prices = price_by_code[product_codes]
 
-print(f"Successfully generated 'sales_transactions.csv' with {len(sales_df)} transactions.")
\ No newline at end of file
+# Create DataFrame and save
+sales_df = pd.DataFrame({
+    'TransactionID': [f"T-{1001 + i}" for i in range(NUM_TRANSACTIONS)],
+    'CustomerID': customers,
+    'ProductID': products,
+    'TransactionDate': START_DATE + pd.to_timedelta(random_days, unit='D'),
+    'Quantity': quantities,
+    'PricePerItem': prices,
+    'TotalPrice': prices * quantities
+})
+
+# Compact dtypes: categorical IDs are stored dictionary-encoded and reload as `category`
+sales_df['CustomerID'] = sales_df['CustomerID'].astype('category')
+sales_df['ProductID'] = sales_df['ProductID'].astype('category')
+sales_df['Quantity'] = sales_df['Quantity'].astype('int16')
+sales_df['PricePerItem'] = sales_df['PricePerItem'].astype('float32')
+sales_df.to_parquet('sales_transactions.parquet', compression='zstd')
+
+print(f"Successfully generated 'sales_transactions.parquet' with {len(sales_df)} transactions.")
\ No newline at end of file